@@ -187,15 +187,17 @@ from hubcap.util import (
     github_repo_object,
     github_file_contents,
     get_repository_info,
+    get_repository_infos,
     cached_github_object,
     Discussions,
     git_clone,
     git_wiki_clone,
     create_markdown_from_jdict,  # Creates a markdown representation of a discussion (metadata json-dict).
     replace_relative_urls,  # replace relative urls with absolute ones
+    compile_url_replacer,  # make a replace_relative_urls function for a fixed root url
     parse_github_url,  #  parse a GitHub URL and returns a dict of its components
     generate_github_url,  # generate a GitHub URL from the provided components dict.
     transform_github_url,  # transform a GitHub URL to another type, updating components as needed.
 )
 from hubcap.tools import hub, notebook_to_markdown
-from hubcap.repo_slurp import repo_text_aggregate
+from hubcap.repo_slurp import repo_text_aggregate, repos_text_aggregate
@@ -17,7 +17,7 @@ from hubcap.util import (
     Repository,
     Discussions,
 )
-from hubcap.constants import repo_collection_names
+from hubcap.constants import repo_collection_names, repo_collection_names_set
 
 
 NotSet = github.GithubObject.NotSet
@@ -120,7 +120,7 @@ def repo_objects_instance(repo, object_name: str) -> Mapping:
         return Issues(repo)
     elif object_name == 'discussions':
         return Discussions(repo)
-    elif object_name in repo_collection_names:
+    elif object_name in repo_collection_names_set:
         return RepoObjects(
             repo,
             get_objs=getattr(Repository, f'get_{object_name}'),
@@ -132,6 +132,7 @@ def repo_objects_instance(repo, object_name: str) -> Mapping:
 
 class RepoReader(KvReader):
     repo_collection_names = sorted(set(repo_collection_names) | {'discussions'})
+    _repo_collection_names_set = repo_collection_names_set | {'discussions'}
 
     # TODO: Separate error handling concern: https://github.com/i2mint/i2/issues/45
     def __init__(self, repo: RepoSpec):
@@ -150,7 +151,7 @@ class RepoReader(KvReader):
         yield from self.repo_collection_names
 
     def __contains__(self, k):
-        return k in self.repo_collection_names
+        return k in self._repo_collection_names_set
 
     def __repr__(self):
         return f'{type(self).__name__}("{self.repo.full_name}")'
@@ -75,6 +75,8 @@ def repo_collection_names_():
 # tuple.__doc__ is read-only, so had to subclass to give my variable a doc
 _tuple = type('_tuple', (tuple,), {'__doc__': repo_collection_names_.__doc__})
 repo_collection_names = _tuple(sorted(repo_collection_names_()))
+# (a set of the same names, for fast membership tests)
+repo_collection_names_set = frozenset(repo_collection_names)
 
 # TODO: When in 3.11, change to Literal[*repo_collection_names]
 RepoCollectionNames = Literal[repo_collection_names]  # type: ignore
@@ -2,15 +2,20 @@
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import re
-from typing import Union, Iterable
+import time
+from functools import lru_cache
+from string import Formatter
+from typing import Union, Iterable, List
 
 Url = str
 Urls = Iterable[Url]
 Table = Union[pd.DataFrame, Url, Urls]
 
-github_url_p = re.compile(r'https?://github.com/(?P<org>[^/]+)/(?P<repo>[^/]+).*?')
+github_url_p = re.compile(r'https?://github\.com/(?P<org>[^/]+)/(?P<repo>[^/]+)')
 
 # TODO: Make the following particulars controllable from outside module
 DFLT_URL_TABLE_SOURCE = (
@@ -18,18 +23,39 @@ DFLT_URL_TABLE_SOURCE = (
 )
 docs_url_template = 'https://{org}.github.io/{repo}'
 repo_docs_url_template = 'https://github.com/{org}/{repo}/tree/master/docs'
+# (bound once, so calls don't have to look up the method, nor unpack a **kwargs dict)
+_docs_url_of_org_and_repo = docs_url_template.format_map
+_repo_docs_url_of_org_and_repo = repo_docs_url_template.format_map
 
 
 def get_doc_state_for_oto_repos(df: Table = DFLT_URL_TABLE_SOURCE, url_column='url'):
     df = _get_table(df)
-    df['doc_page_url'] = df[url_column].apply(repo_url_to_docs_url)
-    df['doc_page_exists'] = df['doc_page_url'].apply(url_exists)
-    df['repo_has_docs_folder'] = df[url_column].apply(
-        lambda url: url_exists(repo_url_to_repo_docs_url(url))
-    )
+    org_and_repo = df[url_column].str.strip().str.extract(github_url_p)
+    df['doc_page_url'] = _format_columns(docs_url_template, org_and_repo)
+    repo_docs_urls = _format_columns(repo_docs_url_template, org_and_repo)
+    # check each (distinct) url only once
+    urls = list(set(df['doc_page_url'].dropna()) | set(repo_docs_urls.dropna()))
+    url_existence = dict(zip(urls, urls_exist(urls)))
+    df['doc_page_exists'] = df['doc_page_url'].map(url_existence)
+    df['repo_has_docs_folder'] = repo_docs_urls.map(url_existence)
     return df
 
 
+def _format_columns(template: str, columns: pd.DataFrame) -> pd.Series:
+    """Vectorized ``template.format(**row)`` over the rows of (string) columns.
+
+    >>> columns = pd.DataFrame({'org': ['i2mint', 'otosense'], 'repo': ['i2', 'oa']})
+    >>> list(_format_columns(docs_url_template, columns))
+    ['https://i2mint.github.io/i2', 'https://otosense.github.io/oa']
+    """
+    formatted = ''
+    for literal, field, _, _ in Formatter().parse(template):
+        formatted = formatted + literal
+        if field is not None:
+            formatted = formatted + columns[field]
+    return formatted
+
+
 def _get_table(df):
     if isinstance(df, str):
         url = df
@@ -45,7 +71,14 @@ def github_org_and_repo(github_url):
     >>> github_org_and_repo('https://github.com/i2mint/i2')
     {'org': 'i2mint', 'repo': 'i2'}
     """
-    return github_url_p.match(github_url.strip()).groupdict()
+    org, repo = _github_org_and_repo(github_url.strip())
+    return {'org': org, 'repo': repo}
+
+
+@lru_cache(maxsize=4096)
+def _github_org_and_repo(github_url):
+    # (caches a tuple, not a dict, so callers can't mutate cached values)
+    return github_url_p.match(github_url).group('org', 'repo')
 
 
 def repo_url_to_docs_url(repo_url):
@@ -53,7 +86,7 @@ def repo_url_to_docs_url(repo_url):
     >>> repo_url_to_docs_url('https://github.com/i2mint/i2')
     'https://i2mint.github.io/i2'
     """
-    return docs_url_template.format(**github_org_and_repo(repo_url))
+    return _docs_url_of_org_and_repo(github_org_and_repo(repo_url))
 
 
 def repo_url_to_repo_docs_url(repo_url):
@@ -61,19 +94,72 @@ def repo_url_to_repo_docs_url(repo_url):
     >>> repo_url_to_repo_docs_url('https://github.com/i2mint/i2')
     'https://github.com/i2mint/i2/tree/master/docs'
     """
-    return repo_docs_url_template.format(**github_org_and_repo(repo_url))
+    return _repo_docs_url_of_org_and_repo(github_org_and_repo(repo_url))
 
 
-def table_url_to_df(url: Url):
-    html = requests.get(url).content
-    df = pd.read_csv(BytesIO(html))
-    df.columns = [column_name.strip() for column_name in df.columns]
-    return df
+DFLT_TABLE_CACHE_TTL_S = 600
+_table_cache = {}  # {url: (timestamp, validation_headers, df), ...}
+
+
+def _validation_headers(response):
+    """The headers to ask the server whether response's content has changed"""
+    headers = {}
+    if etag := response.headers.get('ETag'):
+        headers['If-None-Match'] = etag
+    if last_modified := response.headers.get('Last-Modified'):
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def table_url_to_df(url: Url, *, ttl=DFLT_TABLE_CACHE_TTL_S):
+    """Get the (csv) table at url as a dataframe.
+
+    Tables are cached (for the process): A table younger than ``ttl`` seconds is reused
+    as is, and an older one is only downloaded and parsed again if it changed.
+    """
+    cached = _table_cache.get(url)
+    if cached is not None and time.time() - cached[0] < ttl:
+        return cached[2].copy()
+    headers = cached[1] if cached is not None else {}
+    r = _session.get(url, headers=headers, timeout=DFLT_TIMEOUT_S)
+    if r.status_code == 304 and cached is not None:  # not modified
+        validation_headers, df = cached[1], cached[2]
+    else:
+        r.raise_for_status()
+        df = pd.read_csv(BytesIO(r.content))
+        df.columns = [column_name.strip() for column_name in df.columns]
+        validation_headers = _validation_headers(r)
+    _table_cache[url] = (time.time(), validation_headers, df)
+    return df.copy()  # a copy, since callers (e.g. get_doc_state_for_oto_repos) mutate
 
 
 def is_valid_response(response):
     return response.status_code == 200
 
 
-def url_exists(url):
-    return is_valid_response(requests.get(url))
+DFLT_MAX_WORKERS = 32
+DFLT_TIMEOUT_S = 10
+
+
+def _mk_session(pool_maxsize=DFLT_MAX_WORKERS):
+    """A requests session whose connections are kept alive and pooled"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session = _mk_session()
+
+
+def url_exists(url, *, session=None, timeout=DFLT_TIMEOUT_S):
+    """Whether the url responds with a 200 (to a HEAD request, so no body is fetched)"""
+    session = session or _session
+    return is_valid_response(session.head(url, allow_redirects=True, timeout=timeout))
+
+
+def urls_exist(urls: Urls, max_workers=DFLT_MAX_WORKERS) -> List[bool]:
+    """The ``url_exists`` of each url, the requests being made concurrently"""
+    with ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(url_exists, urls))
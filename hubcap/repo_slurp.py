@@ -8,12 +8,17 @@
 #  What we'd want is to be able to just speak the language of urls, and let the module
 #  take care of caching what it clones (or in the case of discussions, downloads)
 
+import io
 import os
+from pathlib import Path
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Mapping, Union, Literal
 from hubcap.util import (
     ensure_github_url,
     git_clone,
     git_wiki_clone,
+    DFLT_SHALLOW_CLONE_OPTIONS,
 )
 from hubcap.base import RepoReader, ResourceNotFound, NotSet
 
@@ -34,8 +39,43 @@ def kv_to_python_aware_markdown(k, v):
     return f'## {k}\\n\\n{v}\\n\\n'
 
 
+DFLT_MAX_READ_WORKERS = 8
+
+
+def _items(mapping: Mapping, max_workers=DFLT_MAX_READ_WORKERS, min_parallel_items=32):
+    """
+    The (key, value) pairs of a mapping, in key order.
+
+    For large lazy mappings (e.g. files of a folder), the values are fetched
+    concurrently, so that the (I/O bound) reads overlap.
+    In-memory dicts (or a falsy ``max_workers``) just use ``mapping.items()``.
+    """
+    if isinstance(mapping, dict) or not max_workers:
+        return mapping.items()
+    keys = list(mapping)
+    values = _map_reads(mapping.__getitem__, keys, max_workers, min_parallel_items)
+    return zip(keys, values)
+
+
+def _map_reads(
+    read: Callable, keys: list, max_workers=DFLT_MAX_READ_WORKERS, min_parallel_items=32
+) -> Iterable:
+    """The ``read(k)`` values of the keys, in key order.
+
+    When there are more than ``min_parallel_items`` keys, the (I/O bound) reads are
+    done concurrently, by ``max_workers`` threads.
+    """
+    if not max_workers or len(keys) <= min_parallel_items:
+        return map(read, keys)
+    with ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(read, keys))
+
+
 def _text_segments_from_mapping(
-    store, kv_to_text: KvToText = kv_to_python_aware_markdown
+    store,
+    kv_to_text: KvToText = kv_to_python_aware_markdown,
+    *,
+    max_workers: int = DFLT_MAX_READ_WORKERS,
 ) -> Iterable[str]:
     """
     Generates text segments from a given store (mapping) using a formatting function.
@@ -43,17 +83,21 @@ def _text_segments_from_mapping(
     Args:
         store (dict): A mapping with string keys and values.
         kv_to_text (callable): A function that takes a key and value and returns a formatted string.
+        max_workers (int): Max number of threads used to read the values of (large) lazy stores.
 
     Yields:
         str: Text for each kv item
     """
-    for key, value in store.items():
+    for key, value in _items(store, max_workers):
         if value is not None:  # None values are skipped (can use None as sentinel)
             yield kv_to_text(key, value)
 
 
 def text_from_mapping(
-    mapping: Mapping, kv_to_text: KvToText = kv_to_python_aware_markdown
+    mapping: Mapping,
+    kv_to_text: KvToText = kv_to_python_aware_markdown,
+    *,
+    max_workers: int = DFLT_MAX_READ_WORKERS,
 ):
     """
     Creates a string from a given mapping with string keys and values using a formatting function.
@@ -61,6 +105,8 @@ def text_from_mapping(
     Args:
         mapping (dict): A mapping with string keys and values.
         kv_to_text (callable): Function that takes a key and value and returns a string.
+        max_workers (int): Max number of threads used to read the values of (large)
+            lazy mappings. Use 0 (or None) to read them sequentially.
 
     Returns:
         str: A string aggregate of the values of the mapping.
@@ -86,7 +132,24 @@ def text_from_mapping(
     Of the art.
     ```
     """
-    return '\n'.join(_text_segments_from_mapping(mapping, kv_to_text))
+    buffer = io.StringIO()
+    _write_joined(
+        buffer,
+        _text_segments_from_mapping(mapping, kv_to_text, max_workers=max_workers),
+    )
+    return buffer.getvalue()
+
+
+def _write_joined(file, segments: Iterable[str], sep: str = '\n'):
+    """Write the segments to file, separated by sep (like ``sep.join`` would, but
+    without ever holding all segments in memory)"""
+    for i, segment in enumerate(segments):
+        if i:
+            file.write(sep)
+        file.write(segment)
+
+
+_fence_or_header_line_p = re.compile(r'^(?:```|#+)', re.MULTILINE)
 
 
 def add_offset_to_headers(markdown_text: str, offset: int = 0) -> str:
@@ -113,30 +176,27 @@ def add_offset_to_headers(markdown_text: str, offset: int = 0) -> str:
     '### Header 1\n\n```\n# Not a header\n```\n\n#### Header 2'
     """
 
-    def offset_header_line(line: str):
-        if line.startswith('#'):
-            header_level = line.count('#', 0, line.find(' '))
-            new_level = header_level + offset
-            if new_level > 0:
-                return '#' * new_level + line[header_level:]
-            else:
-                return line
-        return line
+    if not offset:
+        return markdown_text
 
+    # Only lines starting with a code fence or a header matter, so we jump from one
+    # such line to the next, copying the text in between as is.
+    segments = []
+    pos = 0
     in_code_block = False
+    for match in _fence_or_header_line_p.finditer(markdown_text):
+        token = match.group()
+        if token == '```':
+            in_code_block = not in_code_block
+        elif not in_code_block:
+            new_level = len(token) + offset
+            if new_level > 0:
+                segments.append(markdown_text[pos : match.start()])
+                segments.append('#' * new_level)
+                pos = match.end()
+    segments.append(markdown_text[pos:])
 
-    def _result_lines():
-        nonlocal in_code_block
-        for line in markdown_text.split('\n'):
-            if line.startswith('```'):
-                in_code_block = not in_code_block
-                yield line
-            elif in_code_block:
-                yield line
-            else:
-                yield offset_header_line(line)
-
-    return '\n'.join(_result_lines())
+    return ''.join(segments)
 
 
 def _ensure_callable_processor(processor, if_true=lambda x: x, if_false=lambda x: None):
@@ -208,12 +268,39 @@ def _markdown_lines(notebook, process_code, process_markdown, process_output):
                     yield f'```\n{processed_output}\n```'
 
 
+def _ensure_notebook_node(notebook, encoding='utf-8'):
+    """Get a (version 4) ``NotebookNode`` from a notebook path, contents or object.
+
+    Already parsed notebooks are used as is, and version 4 contents are parsed with a
+    single ``json.loads``, skipping the schema validation ``nbformat.read`` does.
+    """
+    import json
+    import nbformat
+
+    if isinstance(notebook, nbformat.NotebookNode):
+        return notebook
+    if isinstance(notebook, os.PathLike) or (
+        isinstance(notebook, str) and os.path.isfile(notebook)
+    ):
+        with open(notebook, 'r', encoding=encoding) as f:
+            notebook = f.read()
+    if isinstance(notebook, (bytes, str)):
+        notebook = json.loads(notebook)
+    if not isinstance(notebook, dict):
+        raise ValueError(f'Unsupported type for notebook: {type(notebook)}')
+
+    if notebook.get('nbformat') == 4:
+        return nbformat.v4.to_notebook(notebook)
+    # older formats go through nbformat's full read (and conversion) machinery
+    return nbformat.reads(json.dumps(notebook), as_version=4)
+
+
 # TODO: Move to markdown utils module or package
 # TODO: Write a few useful process_* functions to get useful markdown from code and output cells
 #   For example, not including traceback in error outputs, or only including the last line of
 #   output cells -- or not including scrap sections of code cells.
 def notebook_to_markdown(
-    notebook: Union[str, bytes],
+    notebook: Union[str, bytes, dict],
     *,
     process_code=True,
     process_markdown=True,
@@ -224,7 +311,7 @@ def notebook_to_markdown(
     Transforms a Jupyter notebook into a markdown string with control over cell processing.
 
     Args:
-        notebook: Path to (or bytes or str contents of) the Jupyter notebook.
+        notebook: Path to (or bytes or str contents of, or already parsed) the Jupyter notebook.
         process_code (bool or callable): Whether to include code cells or a callable to process them.
                                          Default is True.
         process_markdown (bool or callable): Whether to include markdown cells or a callable to process them.
@@ -235,23 +322,7 @@ def notebook_to_markdown(
     Returns:
         str: The notebook content as a markdown string.
     """
-    import nbformat
-    import io
-
-    # Make a notebook object
-    if os.path.isfile(notebook):
-        with open(notebook, 'r', encoding=encoding) as f:
-            notebook = nbformat.read(f, as_version=4)
-    if isinstance(notebook, (bytes, str)):
-        if isinstance(notebook, str):
-            notebook = io.StringIO(notebook)
-        elif isinstance(notebook, bytes):
-            notebook = io.BytesIO(notebook)
-        else:
-            raise ValueError(f'Unsupported type for notebook: {type(notebook)}')
-        notebook = nbformat.read(notebook, as_version=4)
-    else:
-        assert isinstance(notebook, nbformat.NotebookNode)
+    notebook = _ensure_notebook_node(notebook, encoding)
 
     return '\n\n'.join(
         filter(
@@ -266,8 +337,9 @@ def notebook_to_markdown(
 
 import tempfile
 import re
-from functools import partial
+from functools import partial, lru_cache
 from subprocess import CalledProcessError
+import subprocess
 from dol import TextFiles, wrap_kvs, filt_iter, Files
 
 
@@ -296,6 +368,17 @@ def ensure_repo_folder(repo: str, clone_func=git_clone):
 
 
 def _decode_to_text_or_skip(obj, log_error_function=False):
+    r"""Decode bytes as utf-8, or return None if they can't be (or are binary).
+
+    >>> _decode_to_text_or_skip(b'hello')
+    'hello'
+    >>> _decode_to_text_or_skip(b'\x89PNG\r\n\x1a\n\x00\x00') is None
+    True
+    """
+    # Binaries (images, archives, ...) nearly always contain a null byte: reject those
+    # upfront, without going through the (costlier) exception machinery
+    if b'\x00' in obj:
+        return None  # Note: None values will be skipped in text_from_mapping
     try:
         return obj.decode('utf-8')
     except UnicodeDecodeError:
@@ -305,24 +388,133 @@ def _decode_to_text_or_skip(obj, log_error_function=False):
         return None  # Note: None values will be skipped in text_from_mapping
 
 
-def all_decodable_text_folder_to_mapping(folder):
-    """A folder_to_mapping function that takes"""
-    return wrap_kvs(Files(folder), obj_of_data=_decode_to_text_or_skip)
+def _git_tracked_files(folder: str):
+    """The (relative) paths of the files git tracks (and has checked out) in folder,
+    or None if folder isn't the root of a git repository.
+
+    Listing these is much cheaper than walking the folder, which includes ``.git/``.
+    Files excluded by a sparse checkout (``S`` tagged by ``ls-files -t``) are skipped,
+    as are entries that aren't regular files (submodules, symlinks to directories).
+    """
+    if not os.path.isdir(os.path.join(folder, '.git')):
+        return None
+    # Note: -C (not --work-tree), since ls-files doesn't see sparse checkout flags when
+    # run from outside the work tree
+    r = subprocess.run(
+        ['git', '-C', folder, 'ls-files', '-t', '-z'], capture_output=True
+    )
+    if r.returncode != 0:
+        return None
+    return [
+        entry[2:]
+        for entry in os.fsdecode(r.stdout).split('\0')
+        if entry
+        and not entry.startswith('S ')
+        and os.path.isfile(os.path.join(folder, entry[2:]))
+    ]
+
+
+class _FolderFilesOfKeys(Mapping):
+    """A (bytes) mapping of some given (relative) files of a folder."""
+
+    def __init__(self, folder: str, keys: Iterable[str]):
+        self.folder = folder
+        self._keys = list(keys)
+        self._key_set = set(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, k):
+        return k in self._key_set
+
+    def __getitem__(self, k):
+        if k not in self._key_set:
+            raise KeyError(k)
+        return Path(self.folder, k).read_bytes()
+
+
+def all_decodable_text_folder_to_mapping(folder, key_filter=None):
+    """A folder_to_mapping function that takes a folder and returns a mapping of the
+    (utf-8) decodable files it contains.
+
+    If ``key_filter`` (a regex pattern or boolean function of the key) is given, keys
+    are filtered *before* any bytes are read, so non-matching files are never read.
+    """
+    tracked_files = _git_tracked_files(folder)
+    if tracked_files is not None:
+        # a git repository: only consider the tracked files (so never walk .git/)
+        if key_filter is not None:
+            tracked_files = filter(_ensure_key_filter(key_filter), tracked_files)
+        files = _FolderFilesOfKeys(folder, tracked_files)
+    else:
+        files = Files(folder)
+        if key_filter is not None:
+            files = filt_iter(files, filt=_ensure_key_filter(key_filter))
+    return wrap_kvs(files, obj_of_data=_decode_to_text_or_skip)
+
+
+@lru_cache(maxsize=64)
+def _compiled_search(pattern: str):
+    """The ``search`` method of the compiled ``pattern`` (compiled once per pattern)"""
+    return re.compile(pattern).search
 
 
 def key_filtered_text_files(folder, key_pattern):
-    return filt_iter(TextFiles(folder), filt=re.compile(key_pattern).search)
+    return filt_iter(TextFiles(folder), filt=_compiled_search(key_pattern))
 
 
 _pattern_for_python_and_markdown_files = r'.*\.(py|md)$'
+_pattern_for_markdown_files = r'.*\.md$'
 
 _filtered_py_and_md_files = partial(
     key_filtered_text_files, key_pattern=_pattern_for_python_and_markdown_files
 )
+# The (gitignore-style) equivalent of _pattern_for_python_and_markdown_files, used to
+# only check out (and download) those files when cloning
+_sparse_patterns_for_python_and_markdown_files = ('*.py', '*.md')
+
+
+def _build_combined_key_pattern(include: str, exclude_prefixes: Iterable[str]) -> str:
+    r"""
+    Make a single pattern matching what ``include`` matches, except keys starting with
+    one of the ``exclude_prefixes``, so that keys can be filtered in one regex pass.
+
+    >>> pattern = _build_combined_key_pattern(r'.*\.(py|md)$', ['docsrc/', 'setup.'])
+    >>> pattern
+    '^(?!docsrc/|setup\\.)(?:.*\\.(py|md)$)'
+    >>> [bool(re.search(pattern, k)) for k in ['a/b.py', 'docsrc/c.md', 'setup.py']]
+    [True, False, False]
+
+    With no prefixes to exclude, ``include`` is returned as is:
+
+    >>> _build_combined_key_pattern(r'.*\.(py|md)$', [])
+    '.*\\.(py|md)$'
+    """
+    exclude = '|'.join(map(re.escape, exclude_prefixes))
+    if not exclude:
+        return include
+    return f'^(?!{exclude})(?:{include})'
+
+
+_docsrc_and_setup_prefixes = ('docsrc/', 'setup.')
+_docsrc_or_setup_prefix_p = re.compile(
+    '|'.join(map(re.escape, _docsrc_and_setup_prefixes))
+)
 
 
 def _does_not_start_with_docsrc_or_setup(key: KT):
-    return not key.startswith('docsrc/') and not key.startswith('setup.')
+    return not _docsrc_or_setup_prefix_p.match(key)
+
+
+_pattern_for_python_and_markdown_files_outside_docsrc_and_setup = (
+    _build_combined_key_pattern(
+        _pattern_for_python_and_markdown_files, _docsrc_and_setup_prefixes
+    )
+)
 
 
 # TODO: A lot more can be done to parametrize the construction of a discussion text
@@ -364,7 +556,8 @@ def discussions_mapping(repo, discussion_json_to_text=_discussion_json_to_text):
     discussions = RepoReader(repo_url)['discussions']
 
     def _gen():
-        for key, d in discussions.items():
+        # (discussions_data gets the discussions in batches, not one request each)
+        for key, d in discussions.discussions_data().items():
             yield f"Discussion {key}: {d['title']}", discussion_json_to_text(d)
 
     return dict(_gen())
@@ -373,39 +566,123 @@ def discussions_mapping(repo, discussion_json_to_text=_discussion_json_to_text):
 def wiki_mapping(repo, local_repo_folder=None, default=NotSet, suppress_errors=True):
     try:
         local_repo_folder = ensure_repo_folder(
-            repo, clone_func=partial(git_wiki_clone, suppress_errors=suppress_errors)
+            repo,
+            clone_func=partial(
+                git_wiki_clone,
+                suppress_errors=suppress_errors,
+                clone_options=DFLT_SHALLOW_CLONE_OPTIONS,
+            ),
         )
-        s = filt_iter(TextFiles(local_repo_folder), filt=re.compile(r'.*\.md$').search)
-        return s
+        return key_filtered_text_files(local_repo_folder, _pattern_for_markdown_files)
     except ResourceNotFound:
         if default is NotSet:
             raise
         return default
 
 
+def _walk_filtered(folder: str, key_filter: Callable[[str], bool]) -> Iterable[str]:
+    """Yields the (relative to folder) paths of the files that pass key_filter,
+    without ever walking into ``.git`` folders."""
+    tracked_files = _git_tracked_files(folder)
+    if tracked_files is not None:
+        yield from filter(key_filter, tracked_files)
+        return
+    for dirpath, dirnames, filenames in os.walk(folder):
+        if '.git' in dirnames:
+            dirnames.remove('.git')
+        reldir = os.path.relpath(dirpath, folder)
+        for filename in filenames:
+            key = filename if reldir == os.curdir else os.path.join(reldir, filename)
+            if key_filter(key):
+                yield key
+
+
+def _read_text_or_skip(filepath: str):
+    try:
+        with open(filepath, encoding='utf-8') as fp:
+            return fp.read()
+    except UnicodeDecodeError:
+        return None  # Note: None values are skipped by _text_dict_of_folder
+
+
+def _text_dict_of_folder(
+    folder: str,
+    key_filter: Callable[[str], bool],
+    kv_to_text: KvToText = kv_to_python_aware_markdown,
+    *,
+    max_workers: int = DFLT_MAX_READ_WORKERS,
+) -> dict:
+    """A ``{key: kv_to_text(key, file_text), ...}`` dict of the filtered files of folder.
+
+    This is what the (lazy) ``dol`` stack of ``repo_files_mapping`` computes, but
+    built eagerly, in one walk, with no wrapper layers between a key and its value.
+    The files are read concurrently (see ``_map_reads``).
+    Files that are not utf-8 decodable are skipped.
+    """
+    keys = list(_walk_filtered(folder, key_filter))
+    filepaths = [os.path.join(folder, k) for k in keys]
+    texts = _map_reads(_read_text_or_skip, filepaths, max_workers)
+    return {
+        k: kv_to_text(k, text)
+        for k, text in zip(keys, texts)
+        if text is not None
+    }
+
+
+def _ensure_key_filter(key_filter):
+    if isinstance(key_filter, str):
+        return _compiled_search(key_filter)
+    return key_filter
+
+
 def repo_files_mapping(
     repo: str,
     *,
     kv_to_text: KvToText = kv_to_python_aware_markdown,
     folder_to_mapping: Union[Callable[[str], Mapping], str] = _filtered_py_and_md_files,
     extra_key_filter=_does_not_start_with_docsrc_or_setup,
+    clone_options: str = DFLT_SHALLOW_CLONE_OPTIONS,
 ):
-    local_repo_folder = ensure_repo_folder(repo)
+    sparse_patterns = ()
+    if folder_to_mapping is _filtered_py_and_md_files:
+        sparse_patterns = _sparse_patterns_for_python_and_markdown_files
+    local_repo_folder = ensure_repo_folder(
+        repo,
+        clone_func=partial(
+            git_clone, clone_options=clone_options, sparse_patterns=sparse_patterns
+        ),
+    )
+    extra_key_filter = _ensure_key_filter(extra_key_filter)
+
+    # In the default case (python and markdown files), bypass the dol store stack and
+    # make a plain dict of the (filtered) files directly
+    if folder_to_mapping is _filtered_py_and_md_files:
+        if extra_key_filter is _does_not_start_with_docsrc_or_setup:
+            # both default filters, folded into a single regex
+            key_filter = _compiled_search(
+                _pattern_for_python_and_markdown_files_outside_docsrc_and_setup
+            )
+        else:
+            key_pattern_search = _compiled_search(
+                _pattern_for_python_and_markdown_files
+            )
+            if extra_key_filter:
+                key_filter = lambda k: key_pattern_search(k) and extra_key_filter(k)
+            else:
+                key_filter = key_pattern_search
+        return _text_dict_of_folder(local_repo_folder, key_filter, kv_to_text)
 
     # If the folder_to_mapping is a string, use the key_filtered_text_files function
     # with the string as the key pattern
     if isinstance(folder_to_mapping, str):
-        key_filter_pattern = folder_to_mapping
         folder_to_mapping = partial(
-            key_filtered_text_files, key_pattern=key_filter_pattern
+            key_filtered_text_files, key_pattern=folder_to_mapping
         )
 
     # Create a mapping for the files in the target folder
     mapping = folder_to_mapping(local_repo_folder)
 
     if extra_key_filter:
-        if isinstance(extra_key_filter, str):
-            extra_key_filter = re.compile(extra_key_filter).search
         mapping = filt_iter(mapping, filt=extra_key_filter)
 
     mapping = wrap_kvs(mapping, postget=kv_to_text)
@@ -452,6 +729,7 @@ def repo_text_aggregate(
     *,
     github_repo_mapping=github_repo_mapping,
     text_from_mapping=text_from_mapping,
+    file=None,
 ):
     """
     Clone a git repository and aggregate all file contents into a string.
@@ -460,9 +738,11 @@ def repo_text_aggregate(
         repo (str): The GitHub repository in the format 'owner/repo' or github url.
         kinds (Union[CloneKinds, Iterable[CloneKinds]], optional):
             The kinds of content to aggregate. Defaults to ('files', 'wiki', 'discussions').
+        file (str or writable, optional): If given, the aggregate is written (kind by
+            kind) to this filepath or text file object, instead of being returned.
 
     Returns:
-        str: A string with all file contents.
+        str: A string with all file contents (or the ``file``, if given).
 
 
     >>> aggregate = repo_text_aggregate('thorwhalen/hubcap')  # doctest: +SKIP
@@ -471,8 +751,53 @@ def repo_text_aggregate(
     A [dol](https://github.com/i2mint/dol) (i.e. dict-like) interface to github...
 
     """
-    text = ''
-    for kind in kinds:
-        mapping = github_repo_mapping(repo, kind=kind)
-        text += text_from_mapping(mapping)
-    return text
+
+    def write_aggregate(file):
+        for kind in kinds:
+            mapping = github_repo_mapping(repo, kind=kind)
+            file.write(text_from_mapping(mapping))
+
+    if file is None:
+        buffer = io.StringIO()
+        write_aggregate(buffer)
+        return buffer.getvalue()
+    elif isinstance(file, str):
+        with open(file, 'w') as fp:
+            write_aggregate(fp)
+    else:
+        write_aggregate(file)
+    return file
+
+
+def repos_text_aggregate(
+    repos: Iterable[str],
+    kinds: Union[CloneKinds, Iterable[CloneKinds]] = ('files', 'wiki', 'discussions'),
+    *,
+    max_workers: int = 8,
+    repo_text_aggregate=repo_text_aggregate,
+) -> dict:
+    """
+    Aggregate the contents of several repositories, concurrently.
+
+    Cloning (and fetching discussions) is network bound, so the repositories are
+    processed in a thread pool instead of one after the other.
+
+    Args:
+        repos (Iterable[str]): GitHub repositories, in the format 'owner/repo' or github urls.
+        kinds (Union[CloneKinds, Iterable[CloneKinds]], optional):
+            The kinds of content to aggregate. Defaults to ('files', 'wiki', 'discussions').
+        max_workers (int): The maximum number of repositories processed at once.
+
+    Returns:
+        dict: A ``{repo: aggregate_text, ...}`` dict, in the order of ``repos``.
+
+
+    >>> aggregates = repos_text_aggregate(['thorwhalen/hubcap', 'i2mint/dol'])  # doctest: +SKIP
+    >>> list(aggregates)  # doctest: +SKIP
+    ['thorwhalen/hubcap', 'i2mint/dol']
+
+    """
+    repos = list(repos)
+    with ThreadPoolExecutor(max_workers) as executor:
+        texts = executor.map(partial(repo_text_aggregate, kinds=kinds), repos)
+        return dict(zip(repos, texts))
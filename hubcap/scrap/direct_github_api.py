@@ -1,12 +1,21 @@
 """Functions that talk directly to api
 """
 import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 
 DFLT_GITHUB_TOKEN_ENVIRON_NAME = 'GITHUB_TOKEN'
 DFLT_USER = 'thorwhalen'
 DFLT_REPO = 'thorwhalen/graze'
+REPOS_CACHE_TTL_S = 300
+ACTIONS_CACHE_TTL_S = 60
 
 
 def get_token(token=None, environ_name=DFLT_GITHUB_TOKEN_ENVIRON_NAME):
@@ -21,6 +30,83 @@ def get_headers(token):
     }
 
 
+def _mk_session(pool_maxsize=32):
+    """A session that reuses (pooled) connections and retries on gateway errors"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(
+        pool_connections=8, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session.mount('https://', adapter)
+    return session
+
+
+_session = _mk_session()
+
+
+class _Page(NamedTuple):
+    """The (parsed json) data of a response, and the url of the next page (if any)"""
+
+    data: Any
+    next_url: Optional[str] = None
+
+
+DFLT_RESPONSE_CACHE_MAXSIZE = 256
+# {key: (timestamp, etag, page), ...}, least recently used first
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def _response_cache_key(url, params, headers):
+    # the headers (which contain the token) are only kept as a hash
+    headers_hash = hashlib.sha256(repr(sorted((headers or {}).items())).encode())
+    return url, tuple(sorted((params or {}).items())), headers_hash.hexdigest()
+
+
+def _cached_get(url, params=None, headers=None, *, ttl=REPOS_CACHE_TTL_S) -> _Page:
+    """The ``_Page`` of a GET request, cached (for the process).
+
+    A cached page younger than ``ttl`` seconds is returned as is. An older one is
+    revalidated with its ETag: If github answers "304 Not Modified" (no body, and not
+    counted against the rate limit), the cached page is returned.
+    Only the last ``DFLT_RESPONSE_CACHE_MAXSIZE`` used pages are kept.
+    Error responses raise an ``HTTPError`` (and aren't cached).
+    """
+    key = _response_cache_key(url, params, headers)
+    with _response_cache_lock:
+        cached = _response_cache.get(key)
+    if cached is not None:
+        timestamp, etag, page = cached
+        if time.time() - timestamp < ttl:
+            return page
+        if etag:
+            headers = dict(headers or {}, **{'If-None-Match': etag})
+    r = _session.get(url, params=params, headers=headers)
+    if r.status_code == 304 and cached is not None:
+        etag, page = cached[1], cached[2]
+    else:
+        r.raise_for_status()
+        etag = r.headers.get('ETag')
+        page = _Page(r.json(), r.links.get('next', {}).get('url'))
+    with _response_cache_lock:
+        _response_cache[key] = (time.time(), etag, page)
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > DFLT_RESPONSE_CACHE_MAXSIZE:
+            _response_cache.popitem(last=False)
+    return page
+
+
+def iter_pages(page: _Page, headers=None, *, ttl=REPOS_CACHE_TTL_S):
+    """Yield the (parsed json) data of the pages of a paginated api listing, starting
+    with ``page``, and following the ``Link: <...>; rel="next"`` urls."""
+    while True:
+        yield page.data
+        if not page.next_url:
+            return
+        # Note: next_url already contains the query parameters
+        page = _cached_get(page.next_url, headers=headers, ttl=ttl)
+
+
 def _repos_info(
     user=DFLT_USER,
     sort='updated',
@@ -30,40 +116,53 @@ def _repos_info(
     token=None,
     **params,
 ):
-    """List repos and their info: raw response object"""
+    """List repos and their info: (first) page of the (json) listing"""
 
     token = get_token(token)
     params = dict(params, sort=sort, direction=direction, per_page=per_page, page=page)
-    r = requests.get(
+    return _cached_get(
         f'https://api.github.com/users/{user}/repos',
         params=params,
         headers=get_headers(token),
+        ttl=REPOS_CACHE_TTL_S,
     )
-    return r
 
 
-def repos_info(user=DFLT_USER, token=None, **params):
-    """List repos and their info: dataframe"""
-    r = _repos_info(user, token=token, **params)
-    df = pd.DataFrame(r.json()).set_index('full_name', drop=False)
+def repos_info(user=DFLT_USER, token=None, *, columns=None, all_pages=True, **params):
+    """List repos and their info: dataframe (indexed by ``full_name``).
+
+    If ``columns`` is given, only those fields (and ``full_name``) are kept.
+    If ``all_pages`` is True, the repos of all (not just the first) pages are listed.
+    """
+    page = _repos_info(user, token=token, **params)
+    if all_pages:
+        headers = get_headers(get_token(token))
+        records = [repo for data in iter_pages(page, headers) for repo in data]
+    else:
+        records = page.data
+    if columns is not None and 'full_name' not in columns:
+        columns = ['full_name', *columns]
+    df = pd.DataFrame(records, columns=columns)
+    df.index = df['full_name']  # (set_index(..., drop=False) would copy the frame)
     return df
 
 
 def _actions_info(repo=DFLT_REPO, per_page=10, token=None, **params):
-    """Github actions runs info: raw response object"""
+    """Github actions runs info: page of the (json) listing"""
     token = get_token(token)
     params = dict(params, per_page=per_page)
-    return requests.get(
+    return _cached_get(
         f'https://api.github.com/repos/{repo}/actions/runs',
         params=params,
         headers=get_headers(token),
+        ttl=ACTIONS_CACHE_TTL_S,
     )
 
 
 def actions_info(repo=DFLT_REPO, per_page=10, token=None, **params):
     """Github actions runs info: dataframe of workflow runs sorted by last updated"""
-    r = _actions_info(repo, per_page=per_page, token=token, **params)
-    workflow_runs = r.json().get('workflow_runs', [])
+    page = _actions_info(repo, per_page=per_page, token=token, **params)
+    workflow_runs = page.data.get('workflow_runs', [])
     df = pd.DataFrame(workflow_runs).sort_values('updated_at', ascending=False)
     return df
 
@@ -71,8 +170,11 @@ def actions_info(repo=DFLT_REPO, per_page=10, token=None, **params):
 def get_last_build_status(repo=DFLT_REPO, token=None, **params):
     """Check on github actions status of a repo """
 
-    r = _actions_info(repo, per_page=1, token=token, **params)
-    runs_docs = r.json().get('workflow_runs', [])
+    try:
+        page = _actions_info(repo, per_page=1, token=token, **params)
+    except requests.HTTPError:
+        return None  # (e.g. no such repo, or no access to its actions)
+    runs_docs = page.data.get('workflow_runs', [])
     # no suitable status was found for a previous build, so the status is "None"
     if not runs_docs:
         return None
@@ -81,34 +183,49 @@ def get_last_build_status(repo=DFLT_REPO, token=None, **params):
     return conclusion
 
 
+DFLT_MAX_WORKERS = 16
+
+
+def last_build_statuses(repos, token=None, *, max_workers=DFLT_MAX_WORKERS):
+    """Get a ``{repo: conclusion, ...}`` dict of the last builds of repos.
+
+    The (network bound) requests are made concurrently.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import partial
+
+    repos = list(repos)
+    with ThreadPoolExecutor(max_workers) as executor:
+        conclusions = executor.map(partial(get_last_build_status, token=token), repos)
+        return dict(zip(repos, conclusions))
+
+
 def get_action_ci_status(repos, hours_ago=24 * 365):
     """Get a table of CI status (failure or success or None) for some repositories"""
     import pandas as pd
 
     updated_recently = repos.iloc[date_selection_lidx(repos, hours_ago=hours_ago)]
-    cis = {repo: get_last_build_status(repo) for repo in updated_recently['full_name']}
+    cis = last_build_statuses(updated_recently['full_name'])
     return pd.Series(cis)
 
 
 from operator import gt
-from datetime import datetime, timedelta
 
 
 def date_selection_lidx(df, hours_ago=24, date_column='updated_at', op=gt):
-    thresh_date = datetime.now() - timedelta(hours=hours_ago)
-    date = f'_{date_column}'
-    df = df.copy()
-    df[date] = pd.to_datetime(df[date_column])
-    df = df.set_index(date, drop=False)
-    return op(df[date], str(thresh_date)).values
+    dates = pd.to_datetime(df[date_column])
+    # hours_ago before the current time, taken in the timezone of the dates (UTC for
+    # github), so both sides of the comparison are the same clock
+    thresh_date = pd.Timestamp.now(tz=dates.dt.tz) - pd.Timedelta(hours=hours_ago)
+    return op(dates, thresh_date).values
 
 
 def ci_status(user=DFLT_USER, hours_ago=24, token=None, **params):
     """Get a dict of CI "conclusions" for all recently updated repos for a user/org"""
-    repos = repos_info(user, token=token, **params)
+    repos = repos_info(user, token=token, columns=['updated_at'], **params)
     updated_recently_lidx = date_selection_lidx(repos, hours_ago=hours_ago)
     updated_recently = repos.iloc[updated_recently_lidx]
-    return {repo: get_last_build_status(repo) for repo in updated_recently['full_name']}
+    return last_build_statuses(updated_recently['full_name'], token=token)
 
 
 # def check_status_changed(status):
@@ -1,46 +1,77 @@
 """A medley of tools for Hubcap."""
 
-from typing import Iterable, Literal
+from typing import Iterable, Literal, Optional, Callable
 import time
-from functools import partial
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial, lru_cache
 
-from hubcap.base import GithubReader, RepoReader
-from hubcap.constants import repo_collection_names
+from github import Github, GithubRetry
+
+from hubcap.base import GithubReader, RepoReader, find_github_token
+from hubcap.constants import repo_collection_names_set
 from hubcap.util import RepoSpec, ensure_url_suffix, _prep_git_clone_args
 
 
+# The resources (first path part after org/repo) that are repository collections
+_repo_collection_resources = repo_collection_names_set | {'discussions'}
+
+
+# The readers are cached since making them involves api requests.
+# Clear the caches (e.g. ``hub.cache_clear()``) to see new changes in a session.
+
+
+@lru_cache(maxsize=128)
+def _github_reader(org):
+    return GithubReader(org)
+
+
+@lru_cache(maxsize=128)
+def _repo_reader(org_repo):
+    return RepoReader(org_repo)
+
+
+def _hub_repo_collection(org, repo, resource, path_iter):
+    return _repo_reader(f'{org}/{repo}')[resource]
+
+
+def _hub_branch(org, repo, resource, path_iter):
+    # TODO: Terrible design: It's GithubReader(org)[repo], not RepoReader, that
+    #  (currently) gives access to branches
+    return _github_reader(org)[repo][resource]
+
+
+def _hub_tree_branch(org, repo, resource, path_iter):
+    # this is to be consistent with browser url access (org/repo/tree/BRANCH/...)
+    # then consider this to be a request for branches
+    return _hub_branch(org, repo, next(path_iter), path_iter)
+
+
+_hub_resource_handlers = dict.fromkeys(_repo_collection_resources, _hub_repo_collection)
+_hub_resource_handlers['tree'] = _hub_tree_branch
+
+
 # TODO: Design horribly unclean. Once RepoReader is finished, this should become
 # cleaner to write.
+@lru_cache(maxsize=1024)
 def hub(path: RepoSpec):
     path = ensure_url_suffix(path)
     if '/' not in path:
         org = path
-        return GithubReader(org)
+        return _github_reader(org)
     # at this point we have at least org/repo/...
     org, repo, *_path = path.split('/')
     if not _path:
-        return GithubReader(org)[repo]
+        return _github_reader(org)[repo]
 
-    # If not, use RepoReader as the base object  # TODO: Finish RepoReader
-    s = RepoReader(f'{org}/{repo}')
+    # If not, dispatch on the resource (the first part of the rest of the path)
+    # TODO: Finish RepoReader
     path_iter = iter(_path)
-    # TODO: Temporarily commented out -- if not needed, remove
-    # if (repo := next(path_iter, None)) is not None:
-    #     s = s[repo]
-    if (resource := next(path_iter, None)) is not None:
-        if resource in repo_collection_names or resource == 'discussions':
-            s = RepoReader(s.repo)[resource]
-        else:
-            # From now we assume the intent is to get a specific branch...
-            if resource == 'tree':  # this is to be consistent with browser url access
-                # then consider this to be a request for branches
-                resource = next(path_iter)
-            else:
-                # TODO: Change what s is suddenly: Terrible design
-                # The point here is that the following instance will then work for
-                # getting the branch
-                s = GithubReader(org)[repo]
-            s = s[resource]
+    resource = next(path_iter)
+    # From now we assume the intent is to get a specific branch, unless resource is a
+    # repository collection (or the "tree" of a branch)
+    handler = _hub_resource_handlers.get(resource, _hub_branch)
+    s = handler(org, repo, resource, path_iter)
 
     # Process the rest of the path with the s mapping
     for part in path_iter:
@@ -48,79 +79,172 @@ def hub(path: RepoSpec):
     return s
 
 
+DFLT_MIN_RATE_LIMIT_REMAINING = 100
+
+
+def _rate_limit_pause(g, min_remaining: int = DFLT_MIN_RATE_LIMIT_REMAINING) -> float:
+    """The number of seconds to wait before the next request, given the rate limit
+    state of the last response: Nothing while there's still budget left, and (when
+    there isn't) enough to spread the remaining requests evenly until the reset."""
+    remaining, _ = g.rate_limiting  # read from the headers of the last response
+    if remaining >= min_remaining:
+        return 0
+    return max(0, g.rate_limiting_resettime - time.time()) / max(remaining, 1)
+
+
+class _RequestPacer:
+    """Spaces out the start of requests (made from any number of threads) by
+    ``interval`` seconds, plus the ``_rate_limit_pause`` of the last response."""
+
+    def __init__(
+        self, g, interval: float = 0, min_remaining=DFLT_MIN_RATE_LIMIT_REMAINING
+    ):
+        self.g = g
+        self.interval = interval
+        self.min_remaining = min_remaining
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            pause = _rate_limit_pause(self.g, self.min_remaining)
+            self._next_start = start + self.interval + pause
+        time.sleep(start - now)
+
+
+# The github objects below are cached per token (and Github instance), so different
+# credentials don't collide.
+# If an org or team is renamed, clear the caches (e.g. ``_get_team.cache_clear()``).
+
+
+@lru_cache(maxsize=8)
+def _get_github(token):
+    """A GitHub instance using the token (if None, GithubReader finds one).
+
+    Its requests are retried on (secondary) rate limit errors, waiting as long as the
+    ``Retry-After`` header says (GithubReader disables retries by default).
+    """
+    return GithubReader(auth=token, retry=GithubRetry(total=10))._github
+
+
+@lru_cache(maxsize=128)
+def _get_organization(g, org: str):
+    return g.get_organization(org)
+
+
+@lru_cache(maxsize=128)
+def _get_team(g, org: str, team: str):
+    return _get_organization(g, org).get_team_by_slug(team)
+
+
+DFLT_TEAM_ACTION_MAX_WORKERS = 8
+
+
 def team_repositories_action(
     repositories: Iterable[str],
     team: str,
     *,
-    action: Literal['add_to_repo', 'remove_from_repos'],
+    action: Literal['add_to_repos', 'remove_from_repos'],
     org: str,
-    wait_s: int = 1,
+    wait_s: float = 0,
+    min_rate_limit_remaining: int = DFLT_MIN_RATE_LIMIT_REMAINING,
+    max_workers: int = DFLT_TEAM_ACTION_MAX_WORKERS,
+    github: Optional[Github] = None,
 ):
     """
     Add a list of repositories to a team with read permission
-    """
-    # Create a GitHub instance using an access token
-    g = GithubReader()._github
 
-    # Get the organization object by name
-    org_ = g.get_organization(org)
+    The (network bound) actions are carried out concurrently, by ``max_workers``
+    threads, their starts spaced by ``wait_s`` seconds, plus a pause that only kicks
+    in when fewer than ``min_rate_limit_remaining`` API calls are left.
+
+    An (authenticated) ``github`` instance can be given. If not, one is made with the
+    token found in the environment.
+    """
+    # Get a GitHub instance using an access token (all cached across calls)
+    g = github or _get_github(find_github_token())
 
-    # Get the team object by name
-    team_ = org_.get_team_by_slug(team)
+    # Get the team object by (organization and) name
+    team_ = _get_team(g, org, team)
     action_ = getattr(team_, action)
 
-    for repo in repositories:
-        # Get the repository object by name
-        repo_ = g.get_repo(repo)
-        # Carry out the action
-        action_(repo_)
-        time.sleep(wait_s)
+    pacer = _RequestPacer(g, wait_s, min_rate_limit_remaining)
 
+    def _do_one(repo):
+        pacer.wait()
+        # Carry out the action (team actions take the "org/repo" name directly, so
+        # there's no need to get (with an extra API call) the repository object)
+        return action_(repo)
 
-add_repos_to_team = partial(team_repositories_action, action='add_to_repo')
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(_do_one, repo) for repo in repositories]
+        try:
+            for future in as_completed(futures):
+                future.result()  # raises the first error as soon as it happens
+        except BaseException:
+            # don't carry out the actions that haven't started yet
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+add_repos_to_team = partial(team_repositories_action, action='add_to_repos')
 rm_repos_from_team = partial(team_repositories_action, action='remove_from_repos')
 
 
 # --------------------------------------------------------------------------------------
 # Converting notebooks to Markdown and cleaning them up
 
-from typing import Optional, Union
+from typing import Optional, Union, MutableMapping
 from pathlib import Path
+import os
+import hashlib
 import re
 from warnings import warn
 
-from hubcap.util import replace_relative_urls, generate_github_url
+from hubcap.util import compile_url_replacer, generate_github_url
 
 
 def _raw_url(org, repo, branch='main', path=''):
+    return _raw_url_prefix(org, repo, branch) + path.lstrip('/')
+
+
+@lru_cache(maxsize=256)
+def _raw_url_prefix(org, repo, branch='main'):
+    """The raw url of the root of the branch (ending with a slash)"""
     components = {
         'username': org,
         'repository': repo,
         'branch': branch,
-        'path': relpath,
+        'path': '',
     }
     return generate_github_url(components, 'fully_qualified_raw')
-    # return (
-    #     f'https://raw.githubusercontent.com/{repo_stub}/refs/heads/{branch}/{relpath}'
-    # )
 
 
-def _handle_repo_root_url(repo_root_url, image_relative_dir=''):
-    # url join repo_root_url and image_relative_dir
-    if image_relative_dir:
-        repo_root_url = f"{repo_root_url.rstrip('/')}/{image_relative_dir.lstrip('/')}"
+def _url_join(url, relative_path):
+    if not relative_path:
+        return url
+    if not url:
+        return relative_path
+    return f"{url.rstrip('/')}/{relative_path.lstrip('/')}"
+
+
+_github_html_url_p = re.compile(r'^https?://(?:www\.)?github\.com(?:/|$)')
 
+
+def _handle_repo_root_url(repo_root_url, image_relative_dir=''):
     if isinstance(repo_root_url, dict):
-        return _raw_url(**repo_root_url)
+        path = _url_join(repo_root_url.get('path', ''), image_relative_dir)
+        return _raw_url(**dict(repo_root_url, path=path))
+
+    # url join repo_root_url and image_relative_dir
+    repo_root_url = _url_join(repo_root_url, image_relative_dir)
     if not repo_root_url.startswith('http'):
         org, repo, branch, *relpath = repo_root_url.split('/')
-        repo_stub = f'{org}/{repo}'
         return _raw_url(org, repo, branch, '/'.join(relpath))
     else:
-        protocol, simple_url = repo_root_url.split('://')
-        if simple_url.startswith('github.com') or simple_url.startswith(
-            'www.github.com'
-        ):
+        if _github_html_url_p.match(repo_root_url):
             warn(
                 f'Your repo_root_url is: {repo_root_url}. I do the work anyway, '
                 'but you may want to consider that usually the URL should be a raw '
@@ -132,6 +256,67 @@ def _handle_repo_root_url(repo_root_url, image_relative_dir=''):
         return repo_root_url
 
 
+@lru_cache(maxsize=1)
+def _markdown_exporter():
+    """The markdown exporter (made once, since making one loads templates and config)"""
+    from nbconvert import MarkdownExporter
+
+    # Optional: exclude input prompts like In[1]:
+    return MarkdownExporter(exclude_input_prompt=True)
+
+
+_markdown_exporter_lock = threading.Lock()
+
+
+DFLT_RESOURCE_WRITE_MAX_WORKERS = 8
+
+
+def _write_resource_files(
+    resource_dir: Path, outputs: dict, max_workers=DFLT_RESOURCE_WRITE_MAX_WORKERS
+):
+    """Write the ``{filename: content_bytes, ...}`` outputs to resource_dir.
+
+    Several files are written concurrently (the GIL is released during the writes).
+    Where supported, files are opened relative to an open descriptor of resource_dir,
+    so the directory path isn't resolved again for every file.
+    """
+    if os.open not in os.supports_dir_fd:
+
+        def write_file(filename):
+            (resource_dir / filename).write_bytes(outputs[filename])
+
+        return _map_writes(write_file, outputs, max_workers)
+
+    dir_fd = os.open(resource_dir, os.O_RDONLY)
+    try:
+
+        def write_file(filename):
+            fd = os.open(filename, _resource_write_flags, 0o666, dir_fd=dir_fd)
+            try:
+                content = memoryview(outputs[filename])
+                while content:  # (os.write may write only part of what it's given)
+                    content = content[os.write(fd, content) :]
+            finally:
+                os.close(fd)
+
+        _map_writes(write_file, outputs, max_workers)
+    finally:
+        os.close(dir_fd)
+
+
+_resource_write_flags = (
+    os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+)
+
+
+def _map_writes(write_file, filenames, max_workers):
+    if len(filenames) <= 1:
+        list(map(write_file, filenames))
+    else:
+        with ThreadPoolExecutor(min(max_workers, len(filenames))) as executor:
+            list(executor.map(write_file, filenames))  # (list, to raise any errors)
+
+
 def notebook_to_markdown(
     notebook_path: str,
     output_dir: Optional[str] = None,
@@ -170,19 +355,10 @@ def notebook_to_markdown(
         repo_root_url="https://github.com/username/repo/blob/main/"
     )
     """
-    from nbconvert import MarkdownExporter
-
-    # Ensure the notebook file exists
-    notebook_path = Path(notebook_path)
-    if not notebook_path.exists():
-        raise FileNotFoundError(f'Notebook not found: {notebook_path}')
-
-    # Load and convert the notebook to Markdown
-    markdown_exporter = MarkdownExporter()
-    markdown_exporter.exclude_input_prompt = (
-        True  # Optional: exclude input prompts like In[1]:
-    )
-    markdown_content, resources = markdown_exporter.from_filename(notebook_path)
+    # Load and convert the notebook to Markdown (raises FileNotFoundError if missing)
+    markdown_exporter = _markdown_exporter()
+    with _markdown_exporter_lock:  # exporters (and their preprocessors) hold state
+        markdown_content, resources = markdown_exporter.from_filename(notebook_path)
 
     if repo_root_url:
         repo_root_url = _handle_repo_root_url(repo_root_url, image_relative_dir)
@@ -199,11 +375,11 @@ def notebook_to_markdown(
         resource_dir = output_dir / image_relative_dir
         resource_dir.mkdir(parents=True, exist_ok=True)
 
-        for filename, content in resources.get('outputs', {}).items():
-            (resource_dir / filename).write_bytes(content)
+        _write_resource_files(resource_dir, resources.get('outputs', {}))
 
         # Write the Markdown file
-        output_filename = output_dir / f'{notebook_path.stem}.md'
+        stem, _ = os.path.splitext(os.path.basename(notebook_path))
+        output_filename = output_dir / f'{stem}.md'
         output_filename.write_text(markdown_content)
     else:
         # If no output directory is specified, images are not saved to disk.
@@ -213,8 +389,42 @@ def notebook_to_markdown(
     return markdown_content
 
 
+# Artifacts of notebook to markdown conversion that should be removed: scoped style
+# blocks and empty python code blocks (in one alternation, so removed in one pass)
+_notebook_markdown_artifacts_p = re.compile(
+    r'<style scoped>.*?</style>|```python\s*```', re.DOTALL
+)
+
+
+_url_replacer = lru_cache(maxsize=64)(compile_url_replacer)
+
+
+# Strings longer than this are taken to be contents, without looking for such a file
+_MAX_FILEPATH_LENGTH = 4096
+
+
+def _is_short_filepath(src) -> bool:
+    """Whether src is a path to an existing file (checking the length first, so that
+    (possibly large) contents are not scanned, nor stat-ed)"""
+    if isinstance(src, os.PathLike):
+        return os.path.isfile(src)
+    return len(src) < _MAX_FILEPATH_LENGTH and os.path.isfile(src)
+
+
+def _postprocess_cache_key(md_src, repo_root_url) -> str:
+    """A key that changes when the md_src file (path) is modified"""
+    mtime_ns = os.stat(md_src).st_mtime_ns
+    return hashlib.sha1(f'{md_src}|{mtime_ns}|{repo_root_url}'.encode()).hexdigest()
+
+
 def postprocess_markdown_from_notebook(
-    md_src: str, repo_root_url: str, md_trg: str = None
+    md_src: str,
+    repo_root_url: str,
+    md_trg: str = None,
+    *,
+    src_kind: Literal['auto', 'path', 'text'] = 'auto',
+    url_replacer: Optional[Callable[[str], str]] = None,
+    cache: Optional[MutableMapping[str, str]] = None,
 ):
     """
     Post-process Markdown content generated from a notebook.
@@ -223,26 +433,52 @@ def postprocess_markdown_from_notebook(
         md_src (str): Markdown content, path to a Markdown file, or path to an ipynb file.
         repo_root_url (str): Root URL for replacing relative paths.
         md_trg (str, optional): Path to save the post-processed Markdown.
+        src_kind (str, optional): Whether md_src is a 'path' or (markdown) 'text'.
+            By default ('auto'), md_src is taken to be a path if it's one of an
+            existing file.
+        url_replacer (callable, optional): The function to replace relative urls with.
+            Give one made with ``compile_url_replacer(repo_root_url)`` to reuse it
+            when processing many files with the same ``repo_root_url``.
+        cache (MutableMapping, optional): Where to keep the results of path sources
+            (e.g. a ``dol.TextFiles`` store), keyed on the path, its modification
+            time and ``repo_root_url``, so that unchanged files aren't processed again.
+            The cache is not used when a ``url_replacer`` is given.
 
     Returns:
         str: The post-processed Markdown content.
 
     """
-    if '\n' not in md_src and Path(md_src).exists():
+    if src_kind == 'auto':
+        src_kind = 'path' if _is_short_filepath(md_src) else 'text'
+    cache_key = None
+    if src_kind == 'path':
+        # (a custom url_replacer isn't part of the key, so its results aren't cached)
+        if cache is not None and url_replacer is None:
+            cache_key = _postprocess_cache_key(md_src, repo_root_url)
+            if cache_key in cache:
+                trg_str = cache[cache_key]
+                if md_trg:
+                    Path(md_trg).write_text(trg_str)
+                return trg_str
         file_path = Path(md_src)
         if file_path.suffix == '.ipynb':
             # If the source is an ipynb file, convert it to Markdown
-            md_src = notebook_to_markdown(file_path, output_dir=None)
+            md_src, _resources = notebook_to_markdown(file_path, output_dir=None)
         else:
             # If the source is a Markdown file, read its contents
             md_src = file_path.read_text()
 
     # Replace relative URLs with absolute raw URLs
-    trg_str = replace_relative_urls(md_src, root_url=repo_root_url)
+    # (md_src is text by now, so no need for replace_relative_urls, which checks whether
+    # its input is a filepath to read from, and write back to)
+    url_replacer = url_replacer or _url_replacer(repo_root_url)
+    trg_str = url_replacer(md_src)
 
     # Remove unwanted artifacts
-    trg_str = re.sub('<style scoped>(.*?)</style>', '', trg_str, flags=re.DOTALL)
-    trg_str = re.sub('```python\s*```', '', trg_str, flags=re.DOTALL)
+    trg_str = _notebook_markdown_artifacts_p.sub('', trg_str)
+
+    if cache_key is not None:
+        cache[cache_key] = trg_str
 
     # Save to the target file if specified
     if md_trg:
@@ -1,12 +1,15 @@
 """Utils for hubcap."""
 
-from typing import Union, Dict, Literal, get_args, Callable
+from typing import Union, Dict, Literal, get_args, Callable, Iterable, Optional
 from functools import lru_cache
 from urllib.parse import urljoin
 from operator import attrgetter
 import os
 import re
 import subprocess
+import threading
+import time
+from collections import OrderedDict
 import tempfile
 
 from lkj import fields_of_string_formats
@@ -16,6 +19,7 @@ from github.Repository import Repository
 
 from hubcap.constants import (
     DFLT_REPO_INFO,
+    _last_commit_date,
     RepoPropSpec,
     RepoFunc,
     RepoInfo,
@@ -162,11 +166,143 @@ def get_repository_info(repo: Repository, repo_info: RepoInfo = DFLT_REPO_INFO):
 
     """
     repo_info = _ensure_repo_info_dict_with_func_values(repo_info)
-    g = cached_github_object()
-    repo = g.get_repo(ensure_full_name(repo))
+    repo = _revalidated_repo(ensure_full_name(repo))
     return {k: f(repo) for k, f in repo_info.items()}
 
 
+# How many repositories to get per (graphQL) request, in get_repository_infos
+DFLT_REPO_INFOS_BATCH_SIZE = 50
+
+
+def get_repository_infos(
+    repos: Iterable[RepoSpec],
+    repo_info: RepoInfo = DFLT_REPO_INFO,
+    *,
+    batch_size: int = DFLT_REPO_INFOS_BATCH_SIZE,
+    token: Optional[str] = None,
+) -> dict:
+    """Get ``{full_name: info, ...}`` for several repositories (see
+    ``get_repository_info`` for the ``repo_info`` argument).
+
+    When all the ``repo_info`` specs have a graphQL equivalent (as the default ones do),
+    the repositories are fetched ``batch_size`` at a time, with one (aliased) graphQL
+    query per batch, instead of with one (REST) request per repository.
+    Otherwise, this falls back to ``get_repository_info`` for each repository.
+
+    >>> get_repository_infos(
+    ...     ['thorwhalen/hubcap', 'i2mint/dol'], 'name'
+    ... )  # doctest: +SKIP
+    {'thorwhalen/hubcap': {'name': 'hubcap'}, 'i2mint/dol': {'name': 'dol'}}
+    """
+    full_names = list(map(ensure_full_name, repos))
+    graphql_fields = _graphql_fields_of_repo_info(repo_info)
+    if graphql_fields is None:  # (some specs need Repository objects to be computed)
+        return {name: get_repository_info(name, repo_info) for name in full_names}
+    headers = {'Authorization': f'Bearer {github_token(token)}'}
+    infos = {}
+    for i in range(0, len(full_names), batch_size):
+        batch = full_names[i : i + batch_size]
+        fields = {field for field, _ in graphql_fields.values()}
+        query = _repo_infos_query(batch, fields)
+        data = _post_graphql_query(DFLT_GRAPHQL_URL, headers, query)['data']
+        for j, name in enumerate(batch):
+            node = data[f'r{j}']
+            infos[name] = {
+                k: egress(node[field]) for k, (field, egress) in graphql_fields.items()
+            }
+    return infos
+
+
+def _identity(x):
+    return x
+
+
+# The (graphQL field, egress) that gives the same value as a repo_info spec
+_graphql_field_of_repo_spec = {
+    'name': ('name', _identity),
+    'full_name': ('nameWithOwner', _identity),
+    'description': ('description', _identity),
+    'stargazers_count': ('stargazerCount', _identity),
+    'watchers_count': ('stargazerCount', _identity),  # (REST's watchers are stars)
+    'forks_count': ('forkCount', _identity),
+    'html_url': ('url', _identity),
+    'homepage': ('homepageUrl', _identity),
+    'private': ('isPrivate', _identity),
+    'fork': ('isFork', _identity),
+    'archived': ('isArchived', _identity),
+    _last_commit_date: ('updatedAt', lambda updated_at: updated_at[:10]),
+}
+
+
+def _graphql_fields_of_repo_info(repo_info: RepoInfo):
+    """The ``{key: (graphql_field, egress), ...}`` of repo_info, or None if some spec
+    has no graphQL equivalent"""
+    if isinstance(repo_info, str):
+        repo_info = {x: x for x in repo_info.split()}
+    graphql_fields = {}
+    for key, spec in dict(repo_info).items():
+        if (field_and_egress := _graphql_field_of_repo_spec.get(spec)) is None:
+            return None
+        graphql_fields[key] = field_and_egress
+    return graphql_fields
+
+
+def _repo_infos_query(full_names, fields):
+    """The graphQL query for the fields of several repositories (aliased ``r{i}``)"""
+    fields_query = ' '.join(sorted(fields))
+    repositories_query = '\n'.join(
+        f'r{i}: repository(owner: "{owner}", name: "{name}") {{ {fields_query} }}'
+        for i, (owner, name) in enumerate(x.split('/') for x in full_names)
+    )
+    return f'query {{\n{repositories_query}\n}}'
+
+
+DFLT_REPO_OBJECTS_MAXSIZE = 512
+# How long (in seconds) a fetched repository is reused before it's revalidated
+DFLT_REPO_OBJECT_TTL_S = 300
+
+# Repository objects already fetched (by ensure_repo_obj or get_repository_info):
+# {full_name: (timestamp, repository), ...}, least recently used first
+_repo_objects = OrderedDict()
+_repo_objects_lock = threading.Lock()
+
+
+def _repo_obj(full_name: str, ttl: float = DFLT_REPO_OBJECT_TTL_S) -> Repository:
+    """Get the repository. It's fetched the first time it's asked for, then reused for
+    ``ttl`` seconds, after which it's refreshed with a conditional (If-None-Match)
+    request, whose 304 response doesn't count against the rate limit."""
+    with _repo_objects_lock:
+        cached = _repo_objects.get(full_name)
+    if cached is None:
+        repo = cached_github_object().get_repo(full_name)
+    else:
+        timestamp, repo = cached
+        if time.time() - timestamp < ttl:
+            with _repo_objects_lock:
+                if full_name in _repo_objects:
+                    _repo_objects.move_to_end(full_name)
+            return repo
+        repo.update()
+    with _repo_objects_lock:
+        _repo_objects[full_name] = (time.time(), repo)
+        _repo_objects.move_to_end(full_name)
+        while len(_repo_objects) > DFLT_REPO_OBJECTS_MAXSIZE:
+            _repo_objects.popitem(last=False)
+    return repo
+
+
+def _revalidated_repo(full_name: str) -> Repository:
+    """Get the repository, refreshed (with a conditional request) if already fetched"""
+    return _repo_obj(full_name, ttl=0)
+
+
+def clear_repo_objects_cache():
+    """Forget the repositories fetched so far (by ``ensure_repo_obj`` and
+    ``get_repository_info``), so that they're fetched anew the next time."""
+    with _repo_objects_lock:
+        _repo_objects.clear()
+
+
 @lru_cache(maxsize=1)
 def cached_github_object():
     return Github()
@@ -340,8 +476,25 @@ def replace_relative_urls(
         <img src="http://mysite.com/docs/path/to/image" width="320">
         <BLANKLINE>
     """
+    return compile_url_replacer(root_url, relative_url_pattern)(markdown_str)
+
+
+def compile_url_replacer(
+    root_url, relative_url_pattern: str = DFLT_RELATIVE_URL_PATTERN
+) -> Callable[[str], str]:
+    """
+    Make a function that replaces relative URLs in a markdown string with absolute URLs
+    based on the root_url (see ``replace_relative_urls``).
+
+    Use it to process many markdown strings with the same root_url: the pattern is
+    compiled, and the root_url prepared, only once.
+
+    >>> replace = compile_url_replacer('http://mysite.com/docs')
+    >>> replace('![](img.png) and [page](./page)')
+    '![](http://mysite.com/docs/img.png) and [page](http://mysite.com/docs/page)'
+    """
     # Define a pattern to match markdown links and images with relative URLs
-    relative_url_pattern = re.compile(relative_url_pattern)
+    sub = _compiled_relative_url_pattern(relative_url_pattern).sub
 
     if not root_url.endswith('/'):
         root_url += '/'
@@ -353,8 +506,15 @@ def replace_relative_urls(
         absolute_url = urljoin(root_url, relative_path)
         return f'{prefix}{absolute_url}{suffix}'
 
-    updated_markdown = relative_url_pattern.sub(replacement, markdown_str)
-    return updated_markdown
+    def replace_urls(markdown_str: str) -> str:
+        return sub(replacement, markdown_str)
+
+    return replace_urls
+
+
+@lru_cache(maxsize=16)
+def _compiled_relative_url_pattern(relative_url_pattern: str):
+    return re.compile(relative_url_pattern)
 
 
 # --------------------------------------------------------------------------- #
@@ -420,6 +580,11 @@ def ensure_url_suffix(url: Union[str, Repository]) -> str:
     """
     if isinstance(url, Repository):
         return url.full_name
+    return _ensure_url_suffix(url)
+
+
+@lru_cache(maxsize=256)
+def _ensure_url_suffix(url: str) -> str:
     return url.split('github.com/')[-1].strip('/')
 
 
@@ -433,10 +598,16 @@ def ensure_full_name(repo: RepoSpec) -> str:
     >>> ensure_full_name('thorwhalen/hubcap')
     'thorwhalen/hubcap'
     """
-    suffix = ensure_url_suffix(repo)
-    slash_seperated = suffix.strip('/').split('/')
-    if len(slash_seperated) == 2:
-        return suffix.strip('/')
+    if isinstance(repo, Repository):
+        return repo.full_name
+    return _ensure_full_name(repo)
+
+
+@lru_cache(maxsize=4096)
+def _ensure_full_name(repo: str) -> str:
+    full_name = _ensure_url_suffix(repo).strip('/')
+    if full_name.count('/') == 1:  # (i.e. two slash-separated parts)
+        return full_name
     else:
         raise ValueError(f"Couldn't (safely) parse {repo} as a repo full name")
 
@@ -449,6 +620,13 @@ def ensure_github_url(user_repo_str: str, prefix='https://github.com/') -> str:
     >>> ensure_github_url('https://github.com/github.com/thorwhalen/hubcap/')
     'https://github.com/thorwhalen/hubcap'
     """
+    if isinstance(user_repo_str, Repository):
+        user_repo_str = user_repo_str.full_name
+    return _ensure_github_url(user_repo_str, prefix)
+
+
+@lru_cache(maxsize=1024)
+def _ensure_github_url(user_repo_str: str, prefix: str) -> str:
     user_repo_str = ensure_full_name(user_repo_str)
     return f"{prefix.strip('/')}/{user_repo_str.strip('/')}"
 
@@ -467,12 +645,15 @@ def ensure_repo_obj(repo: RepoSpec) -> Repository:
     >>> ensure_repo_obj(repo)
     Repository(full_name="thorwhalen/hubcap")
 
+    Fetched repositories are shared (by RepoReader, Discussions, etc.) and reused for
+    ``DFLT_REPO_OBJECT_TTL_S`` seconds, after which they're revalidated (with a cheap
+    conditional request). Call ``clear_repo_objects_cache()`` to forget them all.
+
     """
     if isinstance(repo, Repository):
         return repo
     else:
-        g = cached_github_object()
-        return g.get_repo(ensure_full_name(repo))
+        return _repo_obj(ensure_full_name(repo))
 
 
 # --------------------------------------------------------------------------------------
@@ -558,17 +739,44 @@ def _prep_git_clone_args(repo, clone_to_folder=None):
     return (ensure_github_url(repo), ensure_folder_to_clone_into(clone_to_folder))
 
 
-def git_clone(repo, clone_to_folder=None):
+# Only the latest snapshot of the default branch, with file contents (blobs)
+# downloaded only when checked out
+DFLT_SHALLOW_CLONE_OPTIONS = '--depth=1 --single-branch --filter=blob:none'
+
+
+def _git_clone_command(repo_url, clone_to_folder, clone_options=''):
+    return ' '.join(filter(None, ['clone', clone_options, repo_url, clone_to_folder]))
+
+
+def git_clone(
+    repo, clone_to_folder=None, *, clone_options: str = '', sparse_patterns=()
+):
+    """Clone a repository (into a temporary folder by default) and return the folder.
+
+    :param repo: The repository (url, or 'owner/repo' string)
+    :param clone_to_folder: Where to clone to (a temporary folder if not given)
+    :param clone_options: Extra ``git clone`` options
+        (e.g. ``DFLT_SHALLOW_CLONE_OPTIONS``)
+    :param sparse_patterns: If given, only the files matching these (gitignore-style)
+        patterns are checked out (so, with a ``--filter=blob:none`` clone, downloaded)
+    """
     repo_url, clone_to_folder = _prep_git_clone_args(repo, clone_to_folder)
-    git(f'clone {repo_url} {clone_to_folder}')
+    if sparse_patterns:
+        clone_options = f'{clone_options} --sparse'.strip()
+    git(_git_clone_command(repo_url, clone_to_folder, clone_options))
+    if sparse_patterns:
+        patterns = ' '.join(f"'{pattern}'" for pattern in sparse_patterns)
+        git(f'sparse-checkout set --no-cone {patterns}', work_tree=clone_to_folder)
     return clone_to_folder
 
 
-def git_wiki_clone(repo, clone_to_folder=None, *, suppress_errors=False):
+def git_wiki_clone(
+    repo, clone_to_folder=None, *, suppress_errors=False, clone_options: str = ''
+):
     repo_url, clone_to_folder = _prep_git_clone_args(repo, clone_to_folder)
     try:
         git(
-            f'clone {repo_url}.wiki.git {clone_to_folder}',
+            _git_clone_command(f'{repo_url}.wiki.git', clone_to_folder, clone_options),
             suppress_errors=suppress_errors,
         )
     except subprocess.CalledProcessError as e:
@@ -586,12 +794,14 @@ def git_wiki_clone(repo, clone_to_folder=None, *, suppress_errors=False):
 
 import os
 import requests
-from functools import cached_property, partial
+from copy import deepcopy
+from functools import cached_property
 import json
 from warnings import warn
 from importlib.resources import files
 from typing import Tuple, Optional
-from dol import KvReader, path_get
+from collections.abc import ItemsView, ValuesView
+from dol import KvReader
 from config2py import simple_config_getter
 
 APP_NAME = 'hubcap'
@@ -620,6 +830,24 @@ def defaulted_itemgetter(d, k, default):
     return d.get(k, default)
 
 
+def _get_in(d: dict, keys: Tuple[str, ...]) -> dict:
+    """The ``d[k1][k2]...`` value of the keys, with ``{}`` for missing (or null) ones.
+
+    >>> _get_in({'data': {'repository': None}}, ('data', 'repository', 'discussion'))
+    {}
+    """
+    for k in keys:
+        d = d.get(k) or {}
+    return d
+
+
+try:
+    # orjson (if installed) parses large payloads (e.g. discussion bodies) much faster
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
 def _raise_if_error(data):
     """Raises an error if the data has errors"""
     if errors := data.get('errors'):
@@ -639,19 +867,58 @@ DFLT_DISCUSSION_FIELDS = (
 )
 
 
+DFLT_GRAPHQL_URL = 'https://api.github.com/graphql'
+
+# How many discussions to get per (graphQL) request, in Discussions.discussions_data
+DFLT_DISCUSSIONS_BATCH_SIZE = 10
+# How many discussion numbers to list per request (100 is the graphQL maximum)
+DFLT_DISCUSSIONS_PAGE_SIZE = 100
+# How long (in seconds) a Discussions instance reuses the data it got for a discussion
+DFLT_DISCUSSION_CACHE_TTL_S = 600
+
+
+def _mk_graphql_session():
+    """A session whose (keep-alive) connections are pooled, so consecutive queries
+    don't each pay for a new TLS handshake, and that retries on gateway errors"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=['POST'],  # (safe to retry: our graphQL queries only read)
+        raise_on_status=False,  # (let raise_for_status handle a last failure)
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+    session.mount('https://', adapter)
+    return session
+
+
+_graphql_session = _mk_graphql_session()
+
+
+def _post_graphql_query(url, headers, query):
+    """Post the graphQL query, and return the (parsed, error-checked) response data"""
+    response = _graphql_session.post(url, headers=headers, json={'query': query})
+    response.raise_for_status()
+    # (parsing the bytes directly: no intermediate decoded str)
+    return _raise_if_error(_json_loads(response.content))
+
+
 # TODO: Pack the graphQL query logic further using template-enabled function
 class Discussions(KvReader):
-    get_value = partial(path_get, get_value=partial(defaulted_itemgetter, default={}))
-
     def __init__(
         self,
         repo: RepoSpec,
         *,
         token: Optional[str] = None,
         discussion_fields: Tuple[str] = DFLT_DISCUSSION_FIELDS,
-        _max_discussions: int = 100,
+        _max_discussions: Optional[int] = None,
         _max_comments: int = 100,
         _max_replies: int = 100,
+        cache_ttl: float = DFLT_DISCUSSION_CACHE_TTL_S,
     ):
         repo = ensure_repo_obj(repo)
         self.owner, self.repo_name = ensure_full_name(repo).split('/')
@@ -661,31 +928,52 @@ class Discussions(KvReader):
             'Authorization': f'Bearer {self.token}',
             'Accept': 'application/vnd.github.squirrel-girl-preview',
         }
-        self.url = 'https://api.github.com/graphql'
+        self.url = DFLT_GRAPHQL_URL
         self.discussion_fields = discussion_fields
         self._max_discussions = _max_discussions
         self._max_comments = _max_comments
         self._max_replies = _max_replies
+        self.cache_ttl = cache_ttl
+        self._cache = {}  # {key: (timestamp, discussion_data), ...}
 
     @cached_property
     def _discussions(self):
-        """The discussions metadata of the repository."""
-        query = f'''
-        query {{
-        repository(owner: "{self.owner}", name: "{self.repo_name}") {{
-            discussions(first: {self._max_discussions}) {{
-            nodes {{
-                number
+        """The discussions metadata of the repository.
+
+        The discussions are listed a page (of at most 100) at a time, following the
+        page cursors, up to ``_max_discussions`` discussions (all, if None).
+        """
+        nodes, total_count, cursor = [], 0, None
+        while self._max_discussions is None or len(nodes) < self._max_discussions:
+            page_size = DFLT_DISCUSSIONS_PAGE_SIZE
+            if self._max_discussions is not None:
+                page_size = min(page_size, self._max_discussions - len(nodes))
+            after = f', after: "{cursor}"' if cursor else ''
+            query = f'''
+            query {{
+            repository(owner: "{self.owner}", name: "{self.repo_name}") {{
+                discussions(first: {page_size}{after}) {{
+                nodes {{
+                    number
+                }}
+                totalCount
+                pageInfo {{
+                    hasNextPage
+                    endCursor
+                }}
+                }}
             }}
-            totalCount
             }}
-        }}
-        }}
-        '''
-        response = requests.post(self.url, headers=self.headers, json={'query': query})
-        response.raise_for_status()
-        data = _raise_if_error(response.json())
-        return self.get_value(data, 'data.repository.discussions', {})
+            '''
+            data = _post_graphql_query(self.url, self.headers, query)
+            page = _get_in(data, ('data', 'repository', 'discussions'))
+            nodes.extend(page.get('nodes', []))
+            total_count = page.get('totalCount', 0)
+            page_info = page.get('pageInfo', {})
+            if not page_info.get('hasNextPage'):
+                break
+            cursor = page_info['endCursor']
+        return {'nodes': nodes, 'totalCount': total_count}
 
     @cached_property
     def _discussion_numbers(self):
@@ -693,6 +981,11 @@ class Discussions(KvReader):
         discussions = self._discussions.get('nodes', [])
         return tuple(node['number'] for node in discussions)
 
+    @cached_property
+    def _discussion_number_set(self):
+        """The discussion numbers, as a set (for fast membership tests)."""
+        return frozenset(self._discussion_numbers)
+
     def __iter__(self):
         """Iterates over the discussion numbers (keys of the mapping)."""
         return iter(self._discussion_numbers)
@@ -703,18 +996,112 @@ class Discussions(KvReader):
 
     def __contains__(self, key):
         """Checks if a discussion number (key) is in the mapping."""
-        return key in self._discussion_numbers
+        return key in self._discussion_number_set
 
     def __getitem__(self, key):
-        """Gets the discussion data for a given discussion number (key)."""
+        """Gets the discussion data for a given discussion number (key).
+
+        Data fetched less than ``cache_ttl`` seconds ago is reused, without a request.
+        """
+        discussion = self._fresh_cached_discussion(key)
+        if discussion is not None:
+            return discussion
         query = self._build_query(key)
-        response = requests.post(self.url, headers=self.headers, json={'query': query})
-        response.raise_for_status()
-        data = _raise_if_error(response.json())
-        return self._process_discussion_data(data)
+        data = _post_graphql_query(self.url, self.headers, query)
+        return self._cache_discussion(key, self._process_discussion_data(data))
+
+    def _fresh_cached_discussion(self, key):
+        """A copy of the cached data of the discussion, or None if it's not (freshly)
+        cached. Copies are handed out, so that callers can't change the cache."""
+        cached = self._cache.get(key)
+        if cached is not None and time.time() - cached[0] < self.cache_ttl:
+            return deepcopy(cached[1])
+        return None
+
+    def _cache_discussion(self, key, discussion_data):
+        if self.cache_ttl > 0:
+            self._cache[key] = (time.time(), discussion_data)
+            return deepcopy(discussion_data)
+        return discussion_data
+
+    def items(self):
+        """The (key, discussion_data) pairs, fetched in batches (discussions_data)"""
+        return _DiscussionsItemsView(self)
+
+    def values(self):
+        """The discussions' data, fetched in batches (see discussions_data)"""
+        return _DiscussionsValuesView(self)
+
+    def discussions_data(self, keys=None, *, batch_size=DFLT_DISCUSSIONS_BATCH_SIZE):
+        """A ``{key: discussion_data, ...}`` dict for the given keys (default: all).
+
+        Contrary to getting discussions one by one (one request each), the
+        discussions are fetched ``batch_size`` at a time, with one (aliased) graphQL
+        query per batch.
+        """
+        return dict(self._iter_discussions_data(keys, batch_size=batch_size))
+
+    def _iter_discussions_data(
+        self, keys=None, *, batch_size=DFLT_DISCUSSIONS_BATCH_SIZE
+    ):
+        """Yields (key, discussion_data) pairs (in the order of keys), reusing the
+        freshly cached discussions, and making one request per batch of the others"""
+        pending = []  # (key, cached discussion_data, or None if it's to be fetched)
+        n_to_fetch = 0
+        for key in self if keys is None else keys:
+            discussion = self._fresh_cached_discussion(key)
+            pending.append((key, discussion))
+            n_to_fetch += discussion is None
+            if n_to_fetch == batch_size:
+                yield from self._resolve_pending(pending)
+                pending, n_to_fetch = [], 0
+        yield from self._resolve_pending(pending)
+
+    def _resolve_pending(self, pending):
+        to_fetch = [key for key, discussion in pending if discussion is None]
+        fetched = dict(self._fetch_discussions(to_fetch)) if to_fetch else {}
+        for key, discussion in pending:
+            yield key, fetched[key] if discussion is None else discussion
+
+    def _fetch_discussions(self, keys):
+        """Yields (key, discussion_data) pairs, getting them all in one request"""
+        query = self._build_batch_query(keys)
+        data = _post_graphql_query(self.url, self.headers, query)
+        repository = _get_in(data, ('data', 'repository'))
+        for key in keys:
+            discussion = self._process_discussion(repository.get(f'd{key}') or {})
+            yield key, self._cache_discussion(key, discussion)
+
+    def _build_batch_query(self, keys):
+        """Builds the graphQL query for several discussions (aliased ``d{key}``)."""
+        fields_query = self._fields_query
+        discussions_query = '\n'.join(
+            f'd{key}: discussion(number: {key}) {{ {fields_query} }}' for key in keys
+        )
+        return f'''
+        query {{
+          repository(owner: "{self.owner}", name: "{self.repo_name}") {{
+            {discussions_query}
+          }}
+        }}
+        '''
 
     def _build_query(self, key):
         """Builds the graphQL query for a discussion."""
+        fields_query = self._fields_query
+        return f'''
+        query {{
+          repository(owner: "{self.owner}", name: "{self.repo_name}") {{
+            discussion(number: {key}) {{
+              {fields_query}
+            }}
+          }}
+        }}
+        '''
+
+    @cached_property
+    def _fields_query(self):
+        """The graphQL fields (sub-query) of a discussion (made once per instance)."""
         fields_query = '\n'.join(self.discussion_fields)
         if 'author' in self.discussion_fields:
             fields_query = fields_query.replace('author', 'author { login }')
@@ -739,20 +1126,15 @@ class Discussions(KvReader):
                 }}
             }}''',
             )
-        return f'''
-        query {{
-          repository(owner: "{self.owner}", name: "{self.repo_name}") {{
-            discussion(number: {key}) {{
-              {fields_query}
-            }}
-          }}
-        }}
-        '''
+        return fields_query
 
     def _process_discussion_data(self, data):
         """Processes the discussion data."""
-        discussion = self.get_value(data, 'data.repository.discussion', {})
+        discussion = _get_in(data, ('data', 'repository', 'discussion'))
+        return self._process_discussion(discussion)
 
+    def _process_discussion(self, discussion):
+        """Processes the (graphQL) data of a discussion."""
         comments = [
             {
                 'body': comment['node']['body'],
@@ -773,6 +1155,20 @@ class Discussions(KvReader):
         return result
 
 
+# Iterating over the items (or values) of Discussions would otherwise make one request
+# per discussion (through __getitem__): These views fetch them in batches instead.
+
+
+class _DiscussionsItemsView(ItemsView):
+    def __iter__(self):
+        return self._mapping._iter_discussions_data()
+
+
+class _DiscussionsValuesView(ValuesView):
+    def __iter__(self):
+        return (v for _, v in self._mapping._iter_discussions_data())
+
+
 # TODO: Perculate more control to the arguments
 def create_markdown_from_jdict(jdict: dict):
     """
@@ -782,19 +1178,19 @@ def create_markdown_from_jdict(jdict: dict):
 
     This is meant to be applied to json exports of github discussions or issues.
     """
-    markdown = f"# {jdict['title']}\n\n{jdict['body']}\n\n"
+    # (the sections are collected in a list and joined once, rather than repeatedly
+    # concatenated, which would copy the growing markdown string each time)
+    sections = [f"# {jdict['title']}\n\n{jdict['body']}\n\n"]
 
     # Process comments
-    if jdict.get('comments'):
-        for comment in jdict['comments']:
-            markdown += f"## Comment\n\n{comment['body']}\n\n"
+    for comment in jdict.get('comments') or ():
+        sections.append(f"## Comment\n\n{comment['body']}\n\n")
 
-            # Process replies to comments
-            if comment.get('replies'):
-                for reply in comment['replies']:
-                    markdown += f"### Reply\n\n{reply['body']}\n\n"
+        # Process replies to comments
+        for reply in comment.get('replies') or ():
+            sections.append(f"### Reply\n\n{reply['body']}\n\n")
 
-    return markdown
+    return ''.join(sections)
 
 
 # --------------------------------------------------------------------------------------